@@ -0,0 +1,111 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from inference_server import wait_for_result
+from plant_model import IMAGE_SIZE, INFERENCE_CONFIG_FILE
+
+def _run_trial(intra_op_threads, inter_op_threads, jit_compile, batch_sizes, iterations, results):
+    # Runs in a fresh process: thread pools can't be resized once TensorFlow has started
+    import tensorflow as tf
+    import plant_model
+
+    tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+    tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+    plant_model.INFERENCE_CONFIG_FILE = os.devnull
+    serve = plant_model.get_serving_function("predict", jit_compile)
+
+    timings = {}
+    for batch_size in batch_sizes:
+        batch = np.random.default_rng(0).uniform(0, 255, (batch_size, IMAGE_SIZE[0], IMAGE_SIZE[1], 3)).astype(np.float32)
+        # Warm up: the first calls trace (and with XLA, compile) the function
+        for _ in range(3):
+            serve(batch).numpy()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            serve(batch).numpy()
+        elapsed = (time.perf_counter() - start) / iterations
+        timings[batch_size] = {
+            "latency_ms": elapsed * 1000,
+            "images_per_sec": batch_size / elapsed
+        }
+    results.put(timings)
+
+def thread_candidates():
+    """Intra-op thread counts to try: powers of two up to the core count"""
+    cores = os.cpu_count() or 1
+    candidates = {cores}
+    threads = 1
+    while threads < cores:
+        candidates.add(threads)
+        threads *= 2
+    return sorted(candidates)
+
+def autotune(batch_sizes=(1, 8, 16, 32, 64), iterations=20, try_xla=True, trial_timeout=600):
+    """Benchmark thread-pool settings and batch sizes and return the best configuration"""
+    ctx = multiprocessing.get_context("spawn")
+    trials = []
+    for jit_compile in ([False, True] if try_xla else [False]):
+        for intra_op_threads in thread_candidates():
+            for inter_op_threads in (1, 2):
+                results = ctx.Queue()
+                trial = ctx.Process(target=_run_trial, args=(intra_op_threads, inter_op_threads, jit_compile,
+                                                             list(batch_sizes), iterations, results))
+                trial.start()
+                timings = wait_for_result(trial, results, trial_timeout)
+                if timings is None:
+                    print(f"intra={intra_op_threads:<3} inter={inter_op_threads} xla={str(jit_compile):<5} "
+                          f"skipped: trial failed or timed out (exit code {trial.exitcode})")
+                    continue
+                for batch_size, timing in timings.items():
+                    trials.append({
+                        "intra_op_threads": intra_op_threads,
+                        "inter_op_threads": inter_op_threads,
+                        "jit_compile": jit_compile,
+                        "batch_size": batch_size,
+                        **timing
+                    })
+                    print(f"intra={intra_op_threads:<3} inter={inter_op_threads} xla={str(jit_compile):<5} "
+                          f"batch={batch_size:<3} {timing['latency_ms']:8.2f} ms  {timing['images_per_sec']:8.1f} img/s")
+
+    if not trials:
+        raise RuntimeError("Every autotuning trial failed; check that the model loads")
+
+    # The app classifies one image at a time; batch CLIs care about throughput
+    single = [t for t in trials if t["batch_size"] == 1] or trials
+    app = min(single, key=lambda t: t["latency_ms"])
+    batch = max(trials, key=lambda t: t["images_per_sec"])
+    return {
+        "app": {
+            "intra_op_threads": app["intra_op_threads"],
+            "inter_op_threads": app["inter_op_threads"],
+            "jit_compile": app["jit_compile"]
+        },
+        "batch": {
+            "intra_op_threads": batch["intra_op_threads"],
+            "inter_op_threads": batch["inter_op_threads"],
+            "jit_compile": batch["jit_compile"],
+            "batch_size": batch["batch_size"]
+        },
+        "trials": trials
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Autotune CPU threads and batch size for inference')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 16, 32, 64], help='Batch sizes to benchmark')
+    parser.add_argument('--iterations', type=int, default=20, help='Timed runs per setting')
+    parser.add_argument('--trial-timeout', type=int, default=600, help='Seconds before a trial is abandoned')
+    parser.add_argument('--no-xla', action='store_true', help='Skip XLA-compiled trials')
+
+    args = parser.parse_args()
+
+    config = autotune(args.batch_sizes, args.iterations, not args.no_xla, args.trial_timeout)
+    with open(INFERENCE_CONFIG_FILE, "w") as f:
+        json.dump(config, f, indent=2)
+    print(f"\nApp:   {config['app']}")
+    print(f"Batch: {config['batch']}")
+    print(f"Saved to {INFERENCE_CONFIG_FILE}")
@@ -1,6 +1,8 @@
 import json
 import time
 import os
+import re
+import hashlib
 from pathlib import Path
 import google.generativeai as genai
 import argparse
@@ -15,6 +17,19 @@ QUEUE_FILE = SHARED_DIR / "disease_queue.json"
 RESULTS_FILE = SHARED_DIR / "recommendations.json"
 CHAT_QUEUE_FILE = SHARED_DIR / "chat_queue.json"
 CHAT_RESULTS_FILE = SHARED_DIR / "chat_responses.json"
+CHAT_CACHE_FILE = SHARED_DIR / "chat_cache.json"
+
+# Chat model and response cache settings
+CHAT_MODEL = 'gemini-1.5-pro'
+CHAT_CACHE_TTL = 7 * 24 * 60 * 60  # seconds
+CHAT_CACHE_MAX_ENTRIES = 1000
+# Hit/miss stats and last-used times are written in batches, not on every lookup
+CHAT_CACHE_SAVE_EVERY = 50  # lookups
+CHAT_CACHE_SAVE_INTERVAL = 30  # seconds
+
+_chat_cache = None
+_chat_cache_pending = 0
+_chat_cache_saved_at = 0.0
 
 def initialize_files():
     """Ensure shared directory and files exist"""
@@ -55,9 +70,112 @@ def get_recommendation(disease_name):
     response = model.generate_content(prompt)
     return response.text
 
+def normalize_query(text):
+    """Fold case, punctuation and whitespace so repeated questions match"""
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+def chat_cache_key(query, context, model_name):
+    """Cache key for a chat query, its disease context and the model answering it"""
+    key = json.dumps([model_name, normalize_query(context or ""), normalize_query(query)])
+    return hashlib.sha256(key.encode()).hexdigest()
+
+def _valid_chat_cache(data):
+    """Check a loaded cache file has the expected structure"""
+    if not isinstance(data, dict) or not isinstance(data.get("entries"), dict):
+        return False
+    if not all(isinstance(data.get(name), int) for name in ("hits", "misses")):
+        return False
+    return all(isinstance(e, dict) and {"response", "created", "last_used"} <= e.keys()
+               for e in data["entries"].values())
+
+def load_chat_cache():
+    """Load the persistent chat cache once per process"""
+    global _chat_cache, _chat_cache_saved_at
+    if _chat_cache is None:
+        try:
+            with open(CHAT_CACHE_FILE, "r") as f:
+                _chat_cache = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            _chat_cache = None
+        if not _valid_chat_cache(_chat_cache):
+            _chat_cache = {"entries": {}, "hits": 0, "misses": 0}
+        # Start the save interval now so the first lookup doesn't trigger a write
+        _chat_cache_saved_at = time.time()
+    return _chat_cache
+
+def save_chat_cache(force=False):
+    """Write the cache if forced, or once enough lookups or time have piled up"""
+    global _chat_cache_pending, _chat_cache_saved_at
+    if _chat_cache is None:
+        return
+    due = (_chat_cache_pending >= CHAT_CACHE_SAVE_EVERY or
+           (_chat_cache_pending and time.time() - _chat_cache_saved_at >= CHAT_CACHE_SAVE_INTERVAL))
+    if not (force or due):
+        return
+    # A cache write must never stop a chat from being answered
+    try:
+        CHAT_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(CHAT_CACHE_FILE, "w") as f:
+            json.dump(_chat_cache, f)
+        _chat_cache_pending = 0
+    except OSError as e:
+        print(f"Error saving chat cache: {str(e)}")
+    _chat_cache_saved_at = time.time()
+
+def get_cached_chat_response(key):
+    """Return a cached response if present and not expired, recording the hit or miss"""
+    global _chat_cache_pending
+    cache = load_chat_cache()
+    entry = cache["entries"].get(key)
+    now = time.time()
+    _chat_cache_pending += 1
+
+    if entry and now - entry["created"] < CHAT_CACHE_TTL:
+        entry["last_used"] = now
+        cache["hits"] += 1
+        save_chat_cache()
+        return entry["response"]
+
+    cache["misses"] += 1
+    save_chat_cache()
+    return None
+
+def cache_chat_response(key, response):
+    """Store a response, dropping expired and least recently used entries"""
+    cache = load_chat_cache()
+    entries = cache["entries"]
+    now = time.time()
+    entries[key] = {"response": response, "created": now, "last_used": now}
+
+    for expired in [k for k, e in entries.items() if now - e["created"] >= CHAT_CACHE_TTL]:
+        del entries[expired]
+    if len(entries) > CHAT_CACHE_MAX_ENTRIES:
+        by_last_used = sorted(entries, key=lambda k: entries[k]["last_used"])
+        for evicted in by_last_used[:len(entries) - CHAT_CACHE_MAX_ENTRIES]:
+            del entries[evicted]
+
+    save_chat_cache(force=True)
+
+def chat_cache_stats():
+    """Hit-rate metrics for the chat cache"""
+    cache = load_chat_cache()
+    lookups = cache["hits"] + cache["misses"]
+    return {
+        "entries": len(cache["entries"]),
+        "hits": cache["hits"],
+        "misses": cache["misses"],
+        "hit_rate": cache["hits"] / lookups if lookups else 0.0
+    }
+
 def handle_chat_query(query, context=None):
-    """Process a chat query using Gemini"""
-    model = genai.GenerativeModel('gemini-1.5-pro')
+    """Process a chat query using Gemini, answering repeated questions from the cache"""
+    cache_key = chat_cache_key(query, context, CHAT_MODEL)
+    cached_response = get_cached_chat_response(cache_key)
+    if cached_response is not None:
+        return cached_response
+
+    model = genai.GenerativeModel(CHAT_MODEL)
     
     # Craft the prompt based on whether there's context or not
     if context:
@@ -84,6 +202,7 @@ def handle_chat_query(query, context=None):
         """
     
     response = model.generate_content(prompt)
+    cache_chat_response(cache_key, response.text)
     return response.text
 
 def service_loop():
@@ -214,7 +333,8 @@ def service_loop():
             except:
                 pass
         
-        # Sleep before checking again
+        # Flush any batched cache stats, then sleep before checking again
+        save_chat_cache()
         time.sleep(2)
 
 if __name__ == "__main__":
@@ -222,6 +342,7 @@ if __name__ == "__main__":
     parser.add_argument('--test-disease', type=str, help='Test a specific disease name')
     parser.add_argument('--test-chat', type=str, help='Test a chat query')
     parser.add_argument('--init', action='store_true', help='Initialize chat queue files')
+    parser.add_argument('--cache-stats', action='store_true', help='Show chat cache hit-rate metrics')
     
     args = parser.parse_args()
     
@@ -229,6 +350,10 @@ if __name__ == "__main__":
         print("Initializing chat queue files...")
         initialize_files()
         print("Done.")
+    elif args.cache_stats:
+        stats = chat_cache_stats()
+        print(f"Entries: {stats['entries']}")
+        print(f"Hits: {stats['hits']}  Misses: {stats['misses']}  Hit rate: {stats['hit_rate']:.1%}")
     elif args.test_disease:
         # Test mode - just generate one disease recommendation
         print(f"Testing recommendation for: {args.test_disease}")
@@ -239,6 +364,7 @@ if __name__ == "__main__":
         # Test mode - just generate one chat response
         print(f"Testing chat response for: {args.test_chat}")
         response = handle_chat_query(args.test_chat)
+        save_chat_cache(force=True)
         print("\n===== CHAT RESPONSE =====\n")
         print(response)
     else:
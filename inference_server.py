@@ -0,0 +1,162 @@
+import argparse
+import multiprocessing
+import os
+import queue
+import secrets
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+from plant_model import IMAGE_SIZE, get_serving_function, model_server_authkey, predict_batch, run_local
+
+# Default address for the shared inference process
+SERVER_HOST = "localhost"
+SERVER_PORT = 6010
+
+def current_rss_mb(pid="self"):
+    """Resident set size of a process (default: this one) in MB, or None without /proc"""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except FileNotFoundError:
+        pass
+    return None
+
+def _format_mb(rss):
+    return "n/a" if rss is None else f"{rss:.0f}"
+
+def _handle_connection(conn):
+    with conn:
+        while True:
+            try:
+                op, batch = conn.recv()
+            except (EOFError, OSError):
+                break
+            try:
+                result = run_local(op, batch)
+            except Exception as e:
+                # The original exception may not pickle; send a plain description
+                result = RuntimeError(repr(e))
+            try:
+                conn.send(result)
+            except OSError:
+                break
+
+def serve(host=SERVER_HOST, port=SERVER_PORT):
+    """Hold one copy of the model and answer inference requests from app processes"""
+    # Refuse to start without a secret key: clients send pickled data
+    authkey = model_server_authkey()
+
+    # Build both serving functions up front: the first request isn't slow, and
+    # connection threads can then call them concurrently without any locking
+    get_serving_function("predict")
+    get_serving_function("embed")
+
+    with Listener((host, port), authkey=authkey) as listener:
+        print(f"Inference server listening on {host}:{port} ({_format_mb(current_rss_mb())} MB RSS)")
+        while True:
+            conn = listener.accept()
+            threading.Thread(target=_handle_connection, args=(conn,), daemon=True).start()
+
+def wait_for_result(process, results, timeout):
+    """Get one result from a child process; None if it dies or exceeds the timeout"""
+    deadline = time.time() + timeout
+    while True:
+        try:
+            result = results.get(timeout=1)
+            process.join()
+            return result
+        except queue.Empty:
+            if not process.is_alive():
+                process.join()
+                return None
+            if time.time() > deadline:
+                process.terminate()
+                process.join()
+                return None
+
+def _memory_worker(results):
+    # Behaves like an app process: one prediction, then report RSS
+    predict_batch(np.zeros((1, IMAGE_SIZE[0], IMAGE_SIZE[1], 3), dtype=np.float32))
+    results.put(current_rss_mb())
+
+def _run_workers(ctx, num_workers, timeout=300):
+    workers = []
+    for _ in range(num_workers):
+        results = ctx.Queue()
+        worker = ctx.Process(target=_memory_worker, args=(results,))
+        worker.start()
+        workers.append((worker, results))
+
+    rss = []
+    for i, (worker, results) in enumerate(workers):
+        worker_rss = wait_for_result(worker, results, timeout)
+        if worker_rss is None:
+            print(f"Worker {i} failed or timed out (exit code {worker.exitcode})")
+        rss.append(worker_rss)
+    return rss
+
+def _wait_for_server(host, port, timeout=120):
+    deadline = time.time() + timeout
+    while True:
+        try:
+            Client((host, port), authkey=model_server_authkey()).close()
+            return
+        except ConnectionRefusedError:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.5)
+
+def memory_report(num_workers=4, host=SERVER_HOST, port=SERVER_PORT):
+    """Compare per-process RSS with every process loading the model vs a shared server"""
+    ctx = multiprocessing.get_context("spawn")
+
+    # The report's server is private to this run, so a throwaway key is fine
+    os.environ.setdefault("PLANT_MODEL_AUTHKEY", secrets.token_hex(16))
+    os.environ.pop("PLANT_MODEL_SERVER", None)
+    separate = _run_workers(ctx, num_workers)
+
+    server = ctx.Process(target=serve, args=(host, port), daemon=True)
+    server.start()
+    _wait_for_server(host, port)
+
+    os.environ["PLANT_MODEL_SERVER"] = f"{host}:{port}"
+    try:
+        shared = _run_workers(ctx, num_workers)
+    finally:
+        os.environ.pop("PLANT_MODEL_SERVER", None)
+
+    # Ask the server for its footprint after it has served requests
+    server_rss = current_rss_mb(server.pid)
+    server.terminate()
+
+    print(f"{'mode':<10}{'process':<12}{'RSS (MB)':>10}")
+    for i, rss in enumerate(separate):
+        print(f"{'separate':<10}{f'worker {i}':<12}{_format_mb(rss):>10}")
+    print(f"{'shared':<10}{'server':<12}{_format_mb(server_rss):>10}")
+    for i, rss in enumerate(shared):
+        print(f"{'shared':<10}{f'worker {i}':<12}{_format_mb(rss):>10}")
+    if None in separate + shared + [server_rss]:
+        print("Totals unavailable: some processes failed or RSS could not be read (needs /proc)")
+        return
+    print(f"Total without sharing: {sum(separate):.0f} MB")
+    print(f"Total with sharing:    {server_rss + sum(shared):.0f} MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Shared inference server for the plant disease model',
+                                     epilog='PLANT_MODEL_AUTHKEY must be set to a secret shared with every app process.')
+    parser.add_argument('--host', type=str, default=SERVER_HOST, help='Address to listen on')
+    parser.add_argument('--port', type=int, default=SERVER_PORT, help='Port to listen on')
+    parser.add_argument('--memory-report', action='store_true', help='Compare per-process RSS with and without sharing')
+    parser.add_argument('--workers', type=int, default=4, help='App processes to simulate for the memory report')
+
+    args = parser.parse_args()
+
+    if args.memory_report:
+        memory_report(args.workers, args.host, args.port)
+    else:
+        serve(args.host, args.port)
@@ -1,11 +1,15 @@
 import streamlit as st
-import tensorflow as tf
 import numpy as np
 import json
 import time
 import uuid
 from pathlib import Path
 import os
+import tempfile
+
+from plant_model import CLASS_NAMES, load_image, predict_batch
+from similar_cases import find_similar_images, index_exists, resolve_path
+from video_scanner import iter_image_sequence, scan_frames, scan_path, reported_diseases
 
 # Setup shared paths
 SHARED_DIR = Path("shared")
@@ -21,13 +25,10 @@ if not RESULTS_FILE.exists():
     with open(RESULTS_FILE, "w") as f:
         json.dump({}, f)
 
-# Function to load model and predict
+# Function to predict with the cached (or shared) model
 def model_prediction(test_image):
-    model = tf.keras.models.load_model("trained_model.keras")
-    image = tf.keras.preprocessing.image.load_img(test_image, target_size=(128, 128))
-    input_arr = tf.keras.preprocessing.image.img_to_array(image)
-    input_arr = np.array([input_arr])  # Convert single image to batch
-    predictions = model.predict(input_arr)
+    input_arr = np.array([load_image(test_image)])  # Convert single image to batch
+    predictions = predict_batch(input_arr)
     return np.argmax(predictions)
 
 # Function to request recommendation from Gemini service
@@ -68,6 +69,13 @@ def get_recommendation(request_id):
     
     return results.get(request_id)
 
+# Function to record the detected disease, resetting recommendations when it changes
+def set_current_disease(disease_name):
+    st.session_state['disease'] = disease_name
+    if st.session_state.get('current_disease') != disease_name:
+        st.session_state['current_disease'] = disease_name
+        st.session_state.pop('recommendation_id', None)
+
 # CSS for styling
 def load_css():
     st.markdown("""
@@ -123,7 +131,7 @@ def load_css():
 
 # Streamlit UI
 st.sidebar.title("Dashboard")
-app_mode = st.sidebar.selectbox("Select Page", ["Home", "Disease Recognition by Image", "Disease Recognition by Symptoms", "Chatbot", "Contact Expert", "Shop"])
+app_mode = st.sidebar.selectbox("Select Page", ["Home", "Disease Recognition by Image", "Disease Recognition by Video", "Disease Recognition by Symptoms", "Chatbot", "Contact Expert", "Shop"])
 
 # Load CSS
 load_css()
@@ -226,34 +234,27 @@ elif app_mode == "Disease Recognition by Image":
                 with st.spinner("Analyzing the image..."):
                     st.snow()
                     result_index = model_prediction(test_image)
-                    class_name = [
-                        'Apple___Apple_scab', 'Apple___Black_rot', 'Apple___Cedar_apple_rust', 'Apple___healthy',
-                        'Blueberry___healthy', 'Cherry_(including_sour)___Powdery_mildew',
-                        'Cherry_(including_sour)___healthy', 'Corn_(maize)___Cercospora_leaf_spot Gray_leaf_spot',
-                        'Corn_(maize)___Common_rust_', 'Corn_(maize)___Northern_Leaf_Blight', 'Corn_(maize)___healthy',
-                        'Grape___Black_rot', 'Grape___Esca_(Black_Measles)', 'Grape___Leaf_blight_(Isariopsis_Leaf_Spot)',
-                        'Grape___healthy', 'Orange___Haunglongbing_(Citrus_greening)', 'Peach___Bacterial_spot',
-                        'Peach___healthy', 'Pepper,_bell___Bacterial_spot', 'Pepper,_bell___healthy',
-                        'Potato___Early_blight', 'Potato___Late_blight', 'Potato___healthy',
-                        'Raspberry___healthy', 'Soybean___healthy', 'Squash___Powdery_mildew',
-                        'Strawberry___Leaf_scorch', 'Strawberry___healthy', 'Tomato___Bacterial_spot',
-                        'Tomato___Early_blight', 'Tomato___Late_blight', 'Tomato___Leaf_Mold',
-                        'Tomato___Septoria_leaf_spot', 'Tomato___Spider_mites Two-spotted_spider_mite',
-                        'Tomato___Target_Spot', 'Tomato___Tomato_Yellow_Leaf_Curl_Virus', 'Tomato___Tomato_mosaic_virus',
-                        'Tomato___healthy'
-                    ]
-                    disease_name = class_name[result_index]
-                    st.session_state['disease'] = disease_name
-
-                    if st.session_state['current_disease'] != disease_name:
-                        st.session_state['current_disease'] = disease_name
-                        st.session_state.pop('recommendation_id', None)
+                    disease_name = CLASS_NAMES[result_index]
+                    set_current_disease(disease_name)
 
                     st.success(f"✅ Prediction: **{disease_name}**")
                     
                     # Add verification prompt
                     st.info("Please verify this prediction using the 'Verification' tab or our Symptom-based recognition tool.")
 
+                    # Show the closest reference leaves if the similar-case index has been built
+                    # (skipping reference images that aren't available on this host)
+                    if index_exists():
+                        try:
+                            similar = [m for m in find_similar_images(test_image, k=5) if resolve_path(m["path"]).exists()]
+                            if similar:
+                                st.subheader("🍃 Similar Reference Leaves")
+                                st.image([str(resolve_path(match["path"])) for match in similar],
+                                         caption=[f"{match['label']} ({match['score']:.2f})" for match in similar],
+                                         width=120)
+                        except Exception as e:
+                            st.caption(f"Similar reference leaves are unavailable: {e}")
+
         with tab2:
             if 'disease' in st.session_state:
                 disease_name = st.session_state['disease']
@@ -331,6 +332,51 @@ elif app_mode == "Disease Recognition by Image":
                         
                 st.markdown('</div>', unsafe_allow_html=True)
 
+elif app_mode == "Disease Recognition by Video":
+    st.title("🎥 Plant Disease Recognition by Video")
+
+    st.markdown("""
+    Record a walk-along video of your crop rows, or upload a series of photos, and we will scan
+    the frames for signs of disease. Similar consecutive frames are skipped automatically.
+    """)
+
+    scan_mode = st.radio("What would you like to upload?", ["Video", "Image sequence"], horizontal=True)
+    detections = None
+    if scan_mode == "Video":
+        sample_rate = st.slider("Frames to analyze per second", min_value=0.5, max_value=5.0, value=1.0, step=0.5)
+        test_video = st.file_uploader("Upload a video of your plants", type=["mp4", "mov", "avi", "mkv"])
+        if test_video and st.button("Scan Video"):
+            with st.spinner("Scanning the video..."):
+                # OpenCV needs a file on disk, so spool the upload to a temporary file
+                suffix = Path(test_video.name).suffix
+                with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+                    f.write(test_video.getbuffer())
+                    video_path = f.name
+                try:
+                    detections = scan_path(video_path, sample_rate=sample_rate)
+                finally:
+                    os.remove(video_path)
+    else:
+        test_images = st.file_uploader("Upload photos in the order they were taken", type=["jpg", "jpeg", "png"], accept_multiple_files=True)
+        if test_images and st.button("Scan Images"):
+            with st.spinner("Scanning the images..."):
+                # Every uploaded photo is analyzed; near-duplicates are still skipped
+                detections = scan_frames(iter_image_sequence(test_images))
+
+    if detections is not None:
+        if not detections:
+            st.warning("No frames could be analyzed. Please try a different file.")
+        else:
+            # Single low-confidence frames are ignored; most frequent disease first
+            diseases = reported_diseases(detections)
+            if diseases:
+                st.success("✅ Detected: " + ", ".join(
+                    f"**{s['disease']}** ({s['frames']} of {len(detections)} frames)" for s in diseases))
+                set_current_disease(diseases[0]["disease"])
+            else:
+                st.success("✅ No diseases detected consistently in the analyzed frames.")
+            st.dataframe(detections, use_container_width=True)
+
 elif app_mode == "Disease Recognition by Symptoms":
     st.title("🌿 Plant Disease Recognition by Symptoms")
     
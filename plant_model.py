@@ -0,0 +1,181 @@
+import json
+import os
+import threading
+from multiprocessing.connection import Client
+
+import numpy as np
+from PIL import Image
+
+# Trained classifier and its input size
+MODEL_PATH = "trained_model.keras"
+IMAGE_SIZE = (128, 128)
+
+# Set PLANT_MODEL_SERVER=host:port to use a shared inference_server.py process
+# instead of loading the model in every app process. The server and every app
+# process must also share a secret PLANT_MODEL_AUTHKEY: connections exchange
+# pickled data, so anyone holding the key can run code in the server.
+MODEL_SERVER = os.environ.get("PLANT_MODEL_SERVER")
+MODEL_SERVER_TIMEOUT = float(os.environ.get("PLANT_MODEL_TIMEOUT", "60"))  # seconds per request
+
+# Thread and batch settings written by autotune.py
+INFERENCE_CONFIG_FILE = "inference_config.json"
+
+# Class labels in the order the model was trained on
+CLASS_NAMES = [
+    'Apple___Apple_scab', 'Apple___Black_rot', 'Apple___Cedar_apple_rust', 'Apple___healthy',
+    'Blueberry___healthy', 'Cherry_(including_sour)___Powdery_mildew',
+    'Cherry_(including_sour)___healthy', 'Corn_(maize)___Cercospora_leaf_spot Gray_leaf_spot',
+    'Corn_(maize)___Common_rust_', 'Corn_(maize)___Northern_Leaf_Blight', 'Corn_(maize)___healthy',
+    'Grape___Black_rot', 'Grape___Esca_(Black_Measles)', 'Grape___Leaf_blight_(Isariopsis_Leaf_Spot)',
+    'Grape___healthy', 'Orange___Haunglongbing_(Citrus_greening)', 'Peach___Bacterial_spot',
+    'Peach___healthy', 'Pepper,_bell___Bacterial_spot', 'Pepper,_bell___healthy',
+    'Potato___Early_blight', 'Potato___Late_blight', 'Potato___healthy',
+    'Raspberry___healthy', 'Soybean___healthy', 'Squash___Powdery_mildew',
+    'Strawberry___Leaf_scorch', 'Strawberry___healthy', 'Tomato___Bacterial_spot',
+    'Tomato___Early_blight', 'Tomato___Late_blight', 'Tomato___Leaf_Mold',
+    'Tomato___Septoria_leaf_spot', 'Tomato___Spider_mites Two-spotted_spider_mite',
+    'Tomato___Target_Spot', 'Tomato___Tomato_Yellow_Leaf_Curl_Virus', 'Tomato___Tomato_mosaic_virus',
+    'Tomato___healthy'
+]
+
+_model = None
+_embedding_model = None
+_serving_functions = {}
+_inference_profile = "app"
+_connection = None
+_connection_lock = threading.Lock()
+
+def load_inference_config(profile=None):
+    """Return the autotuned settings for a profile ("app" or "batch"), if any"""
+    try:
+        with open(INFERENCE_CONFIG_FILE, "r") as f:
+            config = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    settings = dict(config.get(profile or _inference_profile, {}))
+    settings.setdefault("jit_compile", config.get("jit_compile", False))
+    return settings
+
+def set_inference_profile(profile):
+    """Pick which autotuned settings to use; call before the first prediction"""
+    global _inference_profile
+    _inference_profile = profile
+
+def inference_batch_size(default):
+    """Autotuned batch size for the batch profile, or the given default"""
+    return load_inference_config("batch").get("batch_size", default)
+
+# TensorFlow is imported lazily so processes that use the shared server never load it
+def configure_threads():
+    """Apply the autotuned thread-pool sizes; call before any TensorFlow op runs"""
+    settings = load_inference_config()
+    # Nothing to tune when inference runs in the shared server
+    if MODEL_SERVER or "intra_op_threads" not in settings:
+        return
+    import tensorflow as tf
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(settings["intra_op_threads"])
+        tf.config.threading.set_inter_op_parallelism_threads(settings["inter_op_threads"])
+    except RuntimeError:
+        # Pools can only be sized before the runtime starts
+        print("TensorFlow already initialized; skipping autotuned thread settings")
+
+def load_model():
+    """Load the trained model once per process"""
+    global _model
+    if _model is None:
+        import tensorflow as tf
+        configure_threads()
+        _model = tf.keras.models.load_model(MODEL_PATH)
+    return _model
+
+def load_embedding_model():
+    """Build a model that outputs the penultimate Dense activations (1500-d)"""
+    global _embedding_model
+    if _embedding_model is None:
+        import tensorflow as tf
+        model = load_model()
+        dense_layers = [layer for layer in model.layers if isinstance(layer, tf.keras.layers.Dense)]
+        _embedding_model = tf.keras.Model(inputs=model.inputs, outputs=dense_layers[-2].output)
+    return _embedding_model
+
+def get_serving_function(op, jit_compile=None):
+    """Graph-mode function with a fixed [None, 128, 128, 3] float32 signature
+
+    Calling it skips the data adapter and callbacks model.predict sets up on
+    every call. jit_compile enables XLA; by default the autotuned choice is used.
+    """
+    if jit_compile is None:
+        jit_compile = load_inference_config().get("jit_compile", False)
+    key = (op, jit_compile)
+    if key not in _serving_functions:
+        import tensorflow as tf
+        model = load_model() if op == "predict" else load_embedding_model()
+
+        @tf.function(input_signature=[tf.TensorSpec([None, IMAGE_SIZE[0], IMAGE_SIZE[1], 3], tf.float32)],
+                     jit_compile=jit_compile)
+        def serve(images):
+            return model(images, training=False)
+
+        _serving_functions[key] = serve
+    return _serving_functions[key]
+
+def run_local(op, batch):
+    """Run inference with the model held by this process"""
+    serve = get_serving_function(op)
+    return serve(np.asarray(batch, dtype=np.float32)).numpy()
+
+def model_server_authkey():
+    """Shared secret for the inference server; there is deliberately no default"""
+    authkey = os.environ.get("PLANT_MODEL_AUTHKEY")
+    if not authkey:
+        raise RuntimeError("PLANT_MODEL_AUTHKEY must be set to a shared secret to use the inference server")
+    return authkey.encode()
+
+def _run_remote(op, batch):
+    global _connection
+    # Streamlit serves sessions from several threads, so share one connection under a lock
+    with _connection_lock:
+        try:
+            if _connection is None:
+                host, port = MODEL_SERVER.rsplit(":", 1)
+                _connection = Client((host, int(port)), authkey=model_server_authkey())
+            _connection.send((op, np.asarray(batch, dtype=np.float32)))
+            # Don't let a stalled server block every session waiting on the lock
+            if not _connection.poll(MODEL_SERVER_TIMEOUT):
+                raise TimeoutError(f"Inference server did not answer within {MODEL_SERVER_TIMEOUT:.0f}s")
+            result = _connection.recv()
+        except (OSError, EOFError):
+            # The connection may hold a late reply, so never reuse it
+            if _connection is not None:
+                _connection.close()
+            _connection = None
+            raise
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+def _run(op, batch):
+    if MODEL_SERVER:
+        return _run_remote(op, batch)
+    return run_local(op, batch)
+
+def predict_batch(batch):
+    """Return class probabilities for a batch of 128x128 RGB images"""
+    return _run("predict", batch)
+
+def embed_batch(batch):
+    """Return feature vectors for a batch of 128x128 RGB images"""
+    return _run("embed", batch)
+
+def prepare_image(image):
+    """Convert a PIL image to the model's 128x128x3 float input"""
+    # Bilinear like the training pipeline; every entry point (app, video
+    # scanner, similar-case index) must share this so features line up
+    image = image.convert("RGB").resize(IMAGE_SIZE, Image.BILINEAR)
+    return np.asarray(image, dtype=np.float32)
+
+def load_image(image_file):
+    """Load an image file as a 128x128x3 float array"""
+    with Image.open(image_file) as image:
+        return prepare_image(image)
@@ -0,0 +1,205 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from plant_model import configure_threads, embed_batch, inference_batch_size, load_image, set_inference_profile
+
+# Index files written by build_index
+INDEX_DIR = Path("similar_index")
+EMBEDDINGS_FILE = "embeddings.npy"
+PROJECTION_FILE = "projection.npz"
+METADATA_FILE = "metadata.json"
+
+# Index paths are stored relative to this root so the dataset can live elsewhere on the app host
+DATASET_ROOT = Path(os.environ.get("PLANT_DATASET_ROOT", "."))
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+_index = None
+
+def list_images(data_dirs, dataset_root=DATASET_ROOT):
+    """Collect (path, label) pairs from class-per-folder directories under dataset_root
+
+    Paths are returned relative to dataset_root.
+    """
+    dataset_root = Path(dataset_root)
+    paths, labels = [], []
+    for data_dir in data_dirs:
+        for class_dir in sorted((dataset_root / data_dir).iterdir()):
+            if not class_dir.is_dir():
+                continue
+            for path in sorted(class_dir.iterdir()):
+                if path.suffix.lower() in IMAGE_EXTENSIONS:
+                    paths.append(path.relative_to(dataset_root).as_posix())
+                    labels.append(class_dir.name)
+    return paths, labels
+
+def resolve_path(path, dataset_root=None):
+    """Absolute location of an index path on this host"""
+    return Path(dataset_root if dataset_root is not None else DATASET_ROOT) / path
+
+def build_index(data_dirs, index_dir=INDEX_DIR, dims=256, batch_size=64, sample_size=20000,
+                dataset_root=DATASET_ROOT):
+    """Embed every dataset image and write a compact float16 index
+
+    Features are reduced to `dims` components with PCA (fitted on a random
+    sample) and L2-normalised, so a dot product gives cosine similarity.
+    Pass dims=0 to keep the full feature vector.
+    """
+    # Only takes effect before TensorFlow starts, so do it first
+    configure_threads()
+
+    index_dir = Path(index_dir)
+    index_dir.mkdir(exist_ok=True)
+    paths, labels = list_images(data_dirs, dataset_root)
+    files = [str(Path(dataset_root) / path) for path in paths]
+    if not paths:
+        raise ValueError(f"No images found in: {', '.join(map(str, data_dirs))}")
+
+    # First pass: stream raw features to disk so memory stays flat. Images are
+    # decoded with load_image, the same preprocessing queries go through
+    raw_path = index_dir / "raw_features.npy"
+    raw = None
+    with ThreadPoolExecutor() as pool:
+        for start in range(0, len(paths), batch_size):
+            batch = np.stack(list(pool.map(load_image, files[start:start + batch_size])))
+            features = embed_batch(batch)
+            if raw is None:
+                raw = np.lib.format.open_memmap(raw_path, mode="w+", dtype=np.float16,
+                                                shape=(len(paths), features.shape[1]))
+            raw[start:start + len(features)] = features
+            print(f"Embedded {start + len(features)}/{len(paths)} images", end="\r")
+    print()
+
+    # Fit PCA on a random sample of rows
+    feature_dims = raw.shape[1]
+    mean = np.zeros(feature_dims, dtype=np.float32)
+    components = np.eye(feature_dims, dtype=np.float32)
+    if 0 < dims < feature_dims:
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(len(paths), min(sample_size, len(paths)), replace=False))
+        sample = np.asarray(raw[sample_rows], dtype=np.float32)
+        mean = sample.mean(axis=0)
+        _, _, vt = np.linalg.svd(sample - mean, full_matrices=False)
+        components = vt[:dims].T.astype(np.float32)
+
+    # Second pass: project, normalise and store as float16
+    embeddings = np.lib.format.open_memmap(index_dir / EMBEDDINGS_FILE, mode="w+", dtype=np.float16,
+                                           shape=(len(paths), components.shape[1]))
+    for start in range(0, len(paths), 8192):
+        chunk = (np.asarray(raw[start:start + 8192], dtype=np.float32) - mean) @ components
+        chunk /= np.linalg.norm(chunk, axis=1, keepdims=True) + 1e-12
+        embeddings[start:start + len(chunk)] = chunk
+    embeddings.flush()
+    del raw, embeddings
+    raw_path.unlink()
+
+    np.savez(index_dir / PROJECTION_FILE, mean=mean, components=components)
+    with open(index_dir / METADATA_FILE, "w") as f:
+        json.dump({"paths": paths, "labels": labels}, f)
+
+    return len(paths)
+
+def load_index(index_dir=INDEX_DIR):
+    """Load the similar-case index once per process"""
+    global _index
+    if _index is None:
+        index_dir = Path(index_dir)
+        projection = np.load(index_dir / PROJECTION_FILE)
+        with open(index_dir / METADATA_FILE, "r") as f:
+            metadata = json.load(f)
+        _index = {
+            "embeddings": np.load(index_dir / EMBEDDINGS_FILE),
+            "mean": projection["mean"],
+            "components": projection["components"],
+            "paths": metadata["paths"],
+            "labels": metadata["labels"]
+        }
+    return _index
+
+def index_exists(index_dir=INDEX_DIR):
+    index_dir = Path(index_dir)
+    return all((index_dir / name).exists() for name in (EMBEDDINGS_FILE, PROJECTION_FILE, METADATA_FILE))
+
+def find_similar(features, k=5, chunk_size=16384):
+    """Return the k reference images closest to a feature vector"""
+    index = load_index()
+    query = (np.asarray(features, dtype=np.float32).reshape(-1) - index["mean"]) @ index["components"]
+    query /= np.linalg.norm(query) + 1e-12
+
+    # Score in float32 chunks; float16 matmul has no BLAS fast path
+    embeddings = index["embeddings"]
+    scores = np.empty(len(embeddings), dtype=np.float32)
+    for start in range(0, len(embeddings), chunk_size):
+        scores[start:start + chunk_size] = embeddings[start:start + chunk_size].astype(np.float32) @ query
+
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return [{"path": index["paths"][i], "label": index["labels"][i], "score": float(scores[i])} for i in top]
+
+def find_similar_images(image_file, k=5):
+    """Embed an image file and return its k nearest reference images"""
+    features = embed_batch(np.array([load_image(image_file)]))[0]
+    return find_similar(features, k)
+
+def index_memory_bytes(index):
+    """Resident size of a loaded index: arrays plus the path and label strings"""
+    arrays = index["embeddings"].nbytes + index["mean"].nbytes + index["components"].nbytes
+    strings = sum(sys.getsizeof(s) for s in index["paths"]) + sum(sys.getsizeof(s) for s in index["labels"])
+    lists = sys.getsizeof(index["paths"]) + sys.getsizeof(index["labels"])
+    return arrays + strings + lists
+
+def benchmark(num_queries=200, k=5):
+    """Report index memory and k-NN query latency (synthetic query vectors)"""
+    index = load_index()
+    embeddings = index["embeddings"]
+    rng = np.random.default_rng(0)
+    feature_dims = index["components"].shape[0]
+    queries = rng.random((num_queries, feature_dims), dtype=np.float32)
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        find_similar(query, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "images": len(embeddings),
+        "dims": embeddings.shape[1],
+        "embeddings_mb": round(embeddings.nbytes / 1024 / 1024, 1),
+        "index_mb": round(index_memory_bytes(index) / 1024 / 1024, 1),
+        "queries": f"{num_queries} synthetic random vectors (projection + search only, no image embedding)",
+        "mean_ms": round(float(np.mean(latencies)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2)
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Similar-case index for plant leaf images')
+    parser.add_argument('--build', nargs='+', metavar='DIR', help='Build the index from dataset directories (e.g. train valid)')
+    parser.add_argument('--dataset-root', type=str, default=str(DATASET_ROOT), help='Directory the dataset paths are relative to')
+    parser.add_argument('--dims', type=int, default=256, help='PCA dimensions to keep (0 keeps all 1500)')
+    parser.add_argument('--batch-size', type=int, default=inference_batch_size(64), help='Images per model batch when building')
+    parser.add_argument('--query', type=str, help='Find reference images similar to this image')
+    parser.add_argument('-k', type=int, default=5, help='Number of neighbours to return')
+    parser.add_argument('--benchmark', action='store_true', help='Report index memory and query latency')
+
+    args = parser.parse_args()
+    set_inference_profile("batch")
+
+    if args.build:
+        count = build_index(args.build, dims=args.dims, batch_size=args.batch_size, dataset_root=args.dataset_root)
+        print(f"Indexed {count} images into {INDEX_DIR}")
+    elif args.query:
+        for match in find_similar_images(args.query, args.k):
+            print(f"{match['score']:.3f}  {match['label']}  {resolve_path(match['path'], args.dataset_root)}")
+    elif args.benchmark:
+        print(json.dumps(benchmark(k=args.k), indent=2))
+    else:
+        parser.print_help()
@@ -0,0 +1,107 @@
+import json
+import sys
+import tempfile
+import types
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Stub the Gemini SDK so the service imports without credentials or network
+_genai = types.ModuleType("google.generativeai")
+_genai.configure = lambda **kwargs: None
+_genai.GenerativeModel = mock.MagicMock()
+_google = sys.modules.setdefault("google", types.ModuleType("google"))
+_google.generativeai = _genai
+sys.modules["google.generativeai"] = _genai
+
+import gemini_service
+
+class ChatCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        cache_file = Path(self.tmp.name) / "shared" / "chat_cache.json"
+        for name, value in [("CHAT_CACHE_FILE", cache_file), ("_chat_cache", None),
+                            ("_chat_cache_pending", 0), ("_chat_cache_saved_at", 0.0)]:
+            patcher = mock.patch.object(gemini_service, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.model = mock.MagicMock()
+        self.model.generate_content.side_effect = lambda prompt: types.SimpleNamespace(
+            text=f"answer {self.model.generate_content.call_count}")
+        patcher = mock.patch.object(gemini_service.genai, "GenerativeModel", return_value=self.model)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_normalize_query_folds_case_punctuation_and_whitespace(self):
+        self.assertEqual(gemini_service.normalize_query("  How do I   treat Early-Blight?? "),
+                         "how do i treat early blight")
+
+    def test_cache_key_separates_query_context_and_model(self):
+        key = gemini_service.chat_cache_key("How do I treat early blight?", None, "m1")
+        self.assertEqual(key, gemini_service.chat_cache_key("how do i treat early blight", None, "m1"))
+        self.assertNotEqual(key, gemini_service.chat_cache_key("how do i treat late blight", None, "m1"))
+        self.assertNotEqual(key, gemini_service.chat_cache_key("how do i treat early blight", "Tomato___Early_blight", "m1"))
+        self.assertNotEqual(key, gemini_service.chat_cache_key("how do i treat early blight", None, "m2"))
+
+    def test_repeated_question_is_answered_from_cache(self):
+        first = gemini_service.handle_chat_query("How do I treat early blight?")
+        second = gemini_service.handle_chat_query("how do i treat  early blight")
+        other = gemini_service.handle_chat_query("How do I treat late blight?")
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertEqual(self.model.generate_content.call_count, 2)
+        stats = gemini_service.chat_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+        self.assertAlmostEqual(stats["hit_rate"], 1 / 3)
+
+    def test_expired_entries_are_not_served(self):
+        key = gemini_service.chat_cache_key("q", None, gemini_service.CHAT_MODEL)
+        with mock.patch.object(gemini_service.time, "time", return_value=1000.0):
+            gemini_service.cache_chat_response(key, "old answer")
+        later = 1000.0 + gemini_service.CHAT_CACHE_TTL + 1
+        with mock.patch.object(gemini_service.time, "time", return_value=later):
+            self.assertIsNone(gemini_service.get_cached_chat_response(key))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        with mock.patch.object(gemini_service, "CHAT_CACHE_MAX_ENTRIES", 2), \
+                mock.patch.object(gemini_service.time, "time") as clock:
+            clock.return_value = 1.0
+            gemini_service.cache_chat_response("a", "A")
+            clock.return_value = 2.0
+            gemini_service.cache_chat_response("b", "B")
+            clock.return_value = 3.0
+            gemini_service.get_cached_chat_response("a")
+            clock.return_value = 4.0
+            gemini_service.cache_chat_response("c", "C")
+
+        self.assertEqual(set(gemini_service.load_chat_cache()["entries"]), {"a", "c"})
+
+    def test_misses_are_persisted_when_the_model_fails(self):
+        self.model.generate_content.side_effect = RuntimeError("api down")
+        with mock.patch.object(gemini_service, "CHAT_CACHE_SAVE_EVERY", 2):
+            for _ in range(2):
+                with self.assertRaises(RuntimeError):
+                    gemini_service.handle_chat_query("q")
+
+        with open(gemini_service.CHAT_CACHE_FILE, "r") as f:
+            self.assertEqual(json.load(f)["misses"], 2)
+
+    def test_lookups_are_written_in_batches(self):
+        gemini_service.get_cached_chat_response("missing")
+        self.assertFalse(gemini_service.CHAT_CACHE_FILE.exists())
+
+    def test_unwritable_cache_does_not_break_chat(self):
+        with mock.patch("builtins.open", side_effect=PermissionError("read-only")):
+            self.assertEqual(gemini_service.handle_chat_query("q"), "answer 1")
+
+    def test_malformed_cache_file_is_replaced(self):
+        gemini_service.CHAT_CACHE_FILE.parent.mkdir(parents=True)
+        with open(gemini_service.CHAT_CACHE_FILE, "w") as f:
+            json.dump({}, f)
+        self.assertEqual(gemini_service.handle_chat_query("q"), "answer 1")
+
+if __name__ == "__main__":
+    unittest.main()
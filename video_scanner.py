@@ -0,0 +1,158 @@
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from plant_model import CLASS_NAMES, IMAGE_SIZE, inference_batch_size, predict_batch, prepare_image, set_inference_profile
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+# A disease is only reported if seen in this many frames, or once with high confidence
+MIN_DETECTION_FRAMES = 2
+MIN_DETECTION_CONFIDENCE = 0.9
+
+def iter_video_frames(video_path, sample_rate=1.0):
+    """Yield (timestamp, PIL image) pairs sampled from a video file"""
+    import cv2
+
+    if sample_rate <= 0:
+        raise ValueError(f"sample_rate must be positive, got {sample_rate}")
+
+    capture = cv2.VideoCapture(str(video_path))
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video: {video_path}")
+
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    step = max(1, int(round(fps / sample_rate)))
+
+    frame_index = 0
+    try:
+        while True:
+            # grab() skips the colour conversion for frames we don't sample
+            if not capture.grab():
+                break
+            if frame_index % step == 0:
+                ok, frame = capture.retrieve()
+                if not ok:
+                    break
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                yield frame_index / fps, Image.fromarray(frame)
+            frame_index += 1
+    finally:
+        capture.release()
+
+def iter_image_sequence(paths, sequence_fps=1.0, sample_rate=1.0):
+    """Yield (timestamp, PIL image) pairs from an ordered list of image files"""
+    if sample_rate <= 0 or sequence_fps <= 0:
+        raise ValueError("sample_rate and sequence_fps must be positive")
+    step = max(1, int(round(sequence_fps / sample_rate)))
+    for index, path in enumerate(paths):
+        if index % step != 0:
+            continue
+        with Image.open(path) as image:
+            yield index / sequence_fps, image.convert("RGB")
+
+def difference_hash(image, hash_size=8):
+    """Compute a 64-bit difference hash used to spot near-duplicate frames"""
+    gray = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = np.asarray(gray, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+def hamming_distance(hash_a, hash_b):
+    return bin(hash_a ^ hash_b).count("1")
+
+def scan_frames(frames, batch_size=16, dedupe_threshold=5):
+    """Classify a stream of frames and return a time-indexed list of detections
+
+    Frames whose hash is within `dedupe_threshold` bits of the last kept frame
+    are dropped. Only one batch of frames is held in memory at a time.
+    """
+    if batch_size <= 0:
+        raise ValueError(f"batch_size must be positive, got {batch_size}")
+
+    detections = []
+    batch = np.empty((batch_size, IMAGE_SIZE[0], IMAGE_SIZE[1], 3), dtype=np.float32)
+    timestamps = []
+    last_hash = None
+
+    def flush():
+        probabilities = predict_batch(batch[:len(timestamps)])
+        for timestamp, probs in zip(timestamps, probabilities):
+            index = int(np.argmax(probs))
+            detections.append({
+                "time": round(float(timestamp), 3),
+                "disease": CLASS_NAMES[index],
+                "confidence": float(probs[index])
+            })
+        timestamps.clear()
+
+    for timestamp, image in frames:
+        frame_hash = difference_hash(image)
+        if last_hash is not None and hamming_distance(frame_hash, last_hash) <= dedupe_threshold:
+            continue
+        last_hash = frame_hash
+
+        batch[len(timestamps)] = prepare_image(image)
+        timestamps.append(timestamp)
+        if len(timestamps) == batch_size:
+            flush()
+
+    if timestamps:
+        flush()
+
+    return detections
+
+def summarize_detections(detections):
+    """Group detections by disease, most frames first (ties broken by confidence)"""
+    summary = {}
+    for detection in detections:
+        entry = summary.setdefault(detection["disease"], {"disease": detection["disease"], "frames": 0, "confidence": 0.0})
+        entry["frames"] += 1
+        entry["confidence"] = max(entry["confidence"], detection["confidence"])
+    return sorted(summary.values(), key=lambda s: (s["frames"], s["confidence"]), reverse=True)
+
+def reported_diseases(detections, min_frames=MIN_DETECTION_FRAMES, min_confidence=MIN_DETECTION_CONFIDENCE):
+    """Diseases (not healthy classes) with enough support to report, most frames first"""
+    return [s for s in summarize_detections(detections)
+            if not s["disease"].endswith("healthy")
+            and (s["frames"] >= min_frames or s["confidence"] >= min_confidence)]
+
+def positive_int(value):
+    value = int(value)
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f"must be positive, got {value}")
+    return value
+
+def positive_float(value):
+    value = float(value)
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f"must be positive, got {value}")
+    return value
+
+def scan_path(path, sample_rate=1.0, sequence_fps=1.0, batch_size=16, dedupe_threshold=5):
+    """Scan a video file or a directory of images"""
+    path = Path(path)
+    if path.is_dir():
+        paths = sorted(p for p in path.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+        frames = iter_image_sequence(paths, sequence_fps, sample_rate)
+    else:
+        frames = iter_video_frames(path, sample_rate)
+    return scan_frames(frames, batch_size, dedupe_threshold)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Scan a video or image sequence for plant diseases')
+    parser.add_argument('path', type=str, help='Video file or directory of images')
+    parser.add_argument('--sample-rate', type=positive_float, default=1.0, help='Frames to sample per second')
+    parser.add_argument('--sequence-fps', type=positive_float, default=1.0, help='Frame rate of an image sequence')
+    parser.add_argument('--batch-size', type=positive_int, default=inference_batch_size(16), help='Frames per model batch')
+    parser.add_argument('--dedupe-threshold', type=int, default=5, help='Max hash bit difference for a duplicate frame')
+
+    args = parser.parse_args()
+    set_inference_profile("batch")
+
+    detections = scan_path(args.path, args.sample_rate, args.sequence_fps,
+                           args.batch_size, args.dedupe_threshold)
+    print(json.dumps(detections, indent=2))